@@ -1,9 +1,21 @@
-import time
-import board
-import neopixel
-import math
-import pandas as pd
+import csv
+import functools
+import json
+import os
+import queue
 import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+
+import numpy as np
+import openpyxl
+from rpi_ws281x import PixelStrip, ws
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # python-calamine is optional; without it the SKU sheet is read with openpyxl
+    CalamineWorkbook = None
 
 # ------------------------------
 # Configuration Parameters
@@ -11,16 +23,30 @@ import threading
 
 # Define the number of LEDs and the GPIO pin
 LED_COUNT = 60          # Number of LED pixels.
-LED_PIN = board.D18     # GPIO pin connected to the pixels (must support PWM!).
+LED_PIN = 18            # GPIO pin connected to the pixels (must support PWM!).
+LED_FREQ_HZ = 800000    # LED signal frequency in hertz.
+LED_DMA = 10            # DMA channel used to generate the signal.
+LED_BRIGHTNESS = 255    # 0 for darkest, 255 for brightest.
+LED_INVERT = False      # True to invert the signal (when using an NPN transistor level shift).
+LED_CHANNEL = 0         # PWM channel for the GPIO pin (0 for GPIO 18).
 
 # Paths to the mapping files
 SKU_EXCEL_FILE_PATH = "/home/anapi01/Downloads/test_sku.xlsx"
 SALES_ORDER_CSV_PATH = "/home/anapi01/WS2812B_test/sales_order.csv"
 
-# Initialize the NeoPixel strip.
-pixels = neopixel.NeoPixel(
-    LED_PIN, LED_COUNT, brightness=1.0, auto_write=False, pixel_order=neopixel.GRB
+# Version of the parsed-file cache; bump it whenever a reader's output changes so older caches are reloaded
+CACHE_VERSION = 2
+
+# Initialize the LED strip. rpi_ws281x drives the data line with DMA and PWM instead of the CPU.
+strip = PixelStrip(
+    LED_COUNT, LED_PIN, LED_FREQ_HZ, LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL, ws.WS2811_STRIP_GRB
 )
+strip.begin()
+
+# Per-pixel setter from the rpi_ws281x C extension, bound to the strip's channel. Calling it directly skips the
+# Python-level wrappers (PixelStrip.setPixelColor and its _LED_Data.__setitem__) behind every pixel write.
+led_set = ws.ws2811_led_set
+led_channel = strip._channel
 
 # Color dictionary for easy color lookup
 COLOR_MAP = {
@@ -32,168 +58,432 @@ COLOR_MAP = {
     "Purple": (128, 0, 128)
 }
 
+# Packed 24-bit color value for a turned-off LED
+OFF = 0
+
 # Breathing effect parameters
 FPS = 30              # Frames per second for smoothness
 BREATH_DURATION = 5   # Duration for one complete breath cycle (seconds)
 
 # ------------------------------
-# Global Variables for Thread Management
+# Function Definitions
 # ------------------------------
 
-# Threads and stop events for SKU and Sales Order breathing effects
-sku_thread = None
-sku_stop_event = threading.Event()
+def valid_addresses(address_list):
+    """
+    Validate LED indices once so later writes don't need to bounds-check them.
 
-so_thread = None
-so_stop_event = threading.Event()
+    :param address_list: A list of LED indices.
+    :return: A sorted tuple of the unique in-range indices.
+    """
+    addrs = []
+    for addr in sorted(set(address_list)):
+        if 0 <= addr < LED_COUNT:
+            addrs.append(addr)
+        else:
+            print(f"[Warning] LED index {addr} is out of range (0 to {LED_COUNT - 1}).")
+    return tuple(addrs)
 
-# Lock to manage access to NeoPixel strip
-pixels_lock = threading.Lock()
+def write_leds(addrs, color):
+    """
+    Write one color to every given LED.
+    The caller must call strip.show() afterwards. Only call it from the anim_loop thread, which owns the strip.
 
-# ------------------------------
-# Function Definitions
-# ------------------------------
+    :param addrs: A tuple of validated LED indices from valid_addresses.
+    :param color: The packed 24-bit color value to write (0xRRGGBB, as from rpi_ws281x.Color).
+    """
+    for addr in addrs:
+        led_set(led_channel, addr, color)
 
-def set_led_color(color_name, address_list):
+def compute_cycle(base_r, base_g, base_b, total_steps):
     """
-    Set specified LEDs to a given color.
+    Compute the color of every step of one breathing cycle.
 
-    :param color_name: The name of the color (e.g., "Orange", "White", "Blue", "Green", "Red", "Purple").
-    :param address_list: A list of LED indices to set the color on.
+    :param base_r: Red channel of the full-brightness color.
+    :param base_g: Green channel of the full-brightness color.
+    :param base_b: Blue channel of the full-brightness color.
+    :param total_steps: Number of frames in one breath cycle.
+    :return: A (total_steps, 3) uint8 array of RGB values.
     """
-    # Validate color name
-    if color_name not in COLOR_MAP:
-        print(f"[Error] Color '{color_name}' not recognized. Available colors: {', '.join(COLOR_MAP.keys())}")
-        return
+    # Sine brightness for the whole cycle in one pass, scaled to an integer 0-256 and applied with a shift
+    steps = np.arange(total_steps)
+    b = (((np.sin(np.pi * steps / (total_steps / 2)) + 1) * 0.5) * 256).astype(np.int64)
+    base = np.array([base_r, base_g, base_b], dtype=np.int64)
+    return ((b.reshape(-1, 1) * base) >> 8).astype(np.uint8)
+
+@functools.lru_cache(maxsize=64)
+def breath_table(color_name, total_steps):
+    """
+    Precompute the color of every step of one breathing cycle, so each frame is a table lookup.
+    Results are memoized, so effects with the same color share one table; don't modify it.
+
+    :param color_name: The name of the color for the breathing effect.
+    :param total_steps: Number of frames in one breath cycle.
+    :return: An array('I') of packed 24-bit color values, one per step.
+    """
+    base_color = COLOR_MAP[color_name]
+    table = compute_cycle(base_color[0], base_color[1], base_color[2], total_steps).astype(np.uint32)
+    packed = (table[:, 0] << 16) | (table[:, 1] << 8) | table[:, 2]
+    return array("I", packed.astype(np.uint32).tobytes())
 
-    # Retrieve the RGB tuple for the given color
-    color = COLOR_MAP[color_name]
+@functools.lru_cache(maxsize=64)
+def breath_holds(color_name, total_steps):
+    """
+    Memoized hold_lengths of the breathing table for a color, shared by every effect using it.
 
-    # Apply the color to each specified LED
-    with pixels_lock:
-        for addr in address_list:
-            if 0 <= addr < LED_COUNT:
-                pixels[addr] = color
-            else:
-                print(f"[Warning] LED index {addr} is out of range (0 to {LED_COUNT - 1}).")
+    :param color_name: The name of the color for the breathing effect.
+    :param total_steps: Number of frames in one breath cycle.
+    :return: A tuple with the run length starting at each step.
+    """
+    return tuple(hold_lengths(breath_table(color_name, total_steps)))
 
-        # Update the LED strip to show the changes
-        pixels.show()
+def hold_lengths(color_lut):
+    """
+    For each step of a breathing table, count how many steps in a row keep the same color.
+    Runs are counted around the end of the cycle, since the breath repeats.
 
-def breathe_effect(color_name, address_list, duration=BREATH_DURATION, fps=FPS, stop_event=threading.Event()):
+    :param color_lut: The breathing table from breath_table.
+    :return: A list with the run length starting at each step.
+    """
+    n = len(color_lut)
+    hold = [1] * n
+    # Walk backwards around the cycle twice so runs that wrap past the last step are counted fully
+    for i in range(2 * n - 1, -1, -1):
+        j = i % n
+        nxt = (j + 1) % n
+        hold[j] = min(hold[nxt] + 1, n) if color_lut[j] == color_lut[nxt] else 1
+    return hold
+
+class Effect:
+    """
+    State of one breathing effect run by anim_loop.
     """
-    Apply a breathing (fade in and out) effect to specified LEDs.
+    __slots__ = ("color_name", "address_list", "color_lut", "hold", "addrs", "start", "last_value")
+
+    def __init__(self, color_name, address_list, total_steps, start):
+        """
+        :param color_name: The name of the color for the breathing effect.
+        :param address_list: A list of LED indices to apply the effect on.
+        :param total_steps: Number of frames in one breath cycle.
+        :param start: time.monotonic() timestamp the cycle starts from.
+        """
+        self.color_name = color_name
+        self.address_list = address_list
+        self.color_lut = breath_table(color_name, total_steps)
+        self.hold = breath_holds(color_name, total_steps)
+        self.addrs = valid_addresses(address_list)  # Validated once instead of on every frame
+        self.start = start
+        self.last_value = None
+
+def anim_loop(commands, duration=BREATH_DURATION, fps=FPS):
+    """
+    Run all breathing (fade in and out) effects from a single thread.
 
-    :param color_name: The name of the color for the breathing effect.
-    :param address_list: A list of LED indices to apply the effect on.
+    Each command on the queue is a (channel, color_name, address_list) tuple. Starting an effect on a channel
+    replaces the one already running there, and a color_name of None just stops it. Where the LEDs of two
+    channels overlap, the channel started later is drawn on top. A None command turns all LEDs off and ends
+    the loop.
+
+    :param commands: queue.Queue of effect commands.
     :param duration: Total duration for one breath cycle (seconds).
     :param fps: Frames per second for smoothness.
-    :param stop_event: threading.Event to signal stopping the effect.
     """
-    # Validate color name
-    if color_name not in COLOR_MAP:
-        print(f"[Error] Color '{color_name}' not recognized. Available colors: {', '.join(COLOR_MAP.keys())}")
-        return
-
     # Calculate the total number of steps for the breathing cycle
     total_steps = duration * fps
 
-    while not stop_event.is_set():
-        for step in range(total_steps):
-            if stop_event.is_set():
+    # Active Effect objects by channel, in the order they were started
+    effects = {}
+
+    # A command received while waiting between frames, applied at the top of the next pass
+    pending = []
+
+    # Bind the names used on every frame as locals to skip the global and attribute lookups
+    _write = write_leds
+    _show = strip.show
+    _monotonic = time.monotonic
+    _get = commands.get
+
+    running = True
+
+    while running:
+        # Apply pending commands; block while there is nothing to animate
+        changed = False
+        while True:
+            if pending:
+                command = pending.pop()
+            else:
+                try:
+                    command = _get(block=not effects)
+                except queue.Empty:
+                    break
+
+            if command is None:
+                running = False
                 break
 
-            # Calculate brightness using a sine wave for smooth transitions
-            brightness = (math.sin(math.pi * step / (total_steps / 2)) + 1) / 2  # Normalized between 0 and 1
+            channel, color_name, address_list = command
+            old = effects.pop(channel, None)
+            if old is not None:
+                _write(old.addrs, OFF)
+                changed = True
+                print(f"\nBreathing effect for color '{old.color_name}' on LEDs {old.address_list} stopped and turned off.")
 
-            # Calculate the current color with adjusted brightness
-            base_color = COLOR_MAP[color_name]
-            current_color = tuple(int(c * brightness) for c in base_color)
+            if color_name is None:
+                continue
+            if color_name not in COLOR_MAP:
+                print(f"[Error] Color '{color_name}' not recognized. Available colors: {', '.join(COLOR_MAP.keys())}")
+                continue
 
-            # Apply the current color to the specified LEDs
-            with pixels_lock:
-                for addr in address_list:
-                    if 0 <= addr < LED_COUNT:
-                        pixels[addr] = current_color
-                    else:
-                        print(f"[Warning] LED index {addr} is out of range (0 to {LED_COUNT - 1}).")
+            effects[channel] = Effect(color_name, address_list, total_steps, _monotonic())
 
-                # Update the LED strip to show the changes
-                pixels.show()
+        if not running:
+            break
 
-            # Control the update rate
-            time.sleep(1 / fps)
+        # Each effect's step comes from the monotonic clock, so frame work and late wakeups never cause drift.
+        # Near the peaks and troughs consecutive steps quantize to the same color; skip rewriting those.
+        # Once one effect is redrawn (or LEDs were turned off above), every later one is redrawn too
+        # so it stays on top where they overlap.
+        now = _monotonic()
+        next_change = None
+        for effect in effects.values():
+            elapsed_steps = int((now - effect.start) * fps)
+            step = elapsed_steps % total_steps
+            value = effect.color_lut[step]
+            if changed or value != effect.last_value:
+                _write(effect.addrs, value)
+                effect.last_value = value
+                changed = True
+
+            # This effect's color next changes once the current run of identical steps ends
+            change_at = effect.start + (elapsed_steps + effect.hold[step]) / fps
+            if next_change is None or change_at < next_change:
+                next_change = change_at
+
+        # Update the LED strip once for all effects
+        if changed:
+            _show()
+
+        # Sleep through the flat parts of the cycle until some effect changes color,
+        # waking early if a new command arrives
+        if next_change is not None:
+            sleep_for = next_change - _monotonic()
+            if sleep_for > 0:
+                try:
+                    pending.append(_get(timeout=sleep_for))
+                except queue.Empty:
+                    pass
+
+    # Once shut down, ensure all LEDs are turned off
+    _write(tuple(range(LED_COUNT)), OFF)
+    _show()
+
+def load_cached(path, read_fn):
+    """
+    Load a data file through a JSON cache kept in a .cache folder next to it.
+    The cache name covers the file's name, modification time and size and CACHE_VERSION, so any change to the
+    file or to how it is parsed is picked up.
+    JSON rather than pickle, so a tampered cache file can't run code when the script is started as root.
+
+    :param path: Path to the data file.
+    :param read_fn: Function that parses the file into a list of tuples, called with the path on a cache miss.
+    :return: The parsed list of tuples.
+    """
+    stat = os.stat(path)
+    path = os.path.abspath(path)
+    cache_dir = os.path.join(os.path.dirname(path), ".cache")
+    prefix = os.path.basename(path) + "-"
+    cache_path = os.path.join(cache_dir, f"{prefix}v{CACHE_VERSION}-{stat.st_mtime_ns}-{stat.st_size}.json")
+
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                return [tuple(row) for row in json.load(f)]
+        except Exception as e:
+            print(f"[Warning] Could not read cache {cache_path}, reloading {path}: {e}")
+
+    data = read_fn(path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Drop caches of older versions of this file before saving the new one
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix) and name.endswith(".json"):
+                os.remove(os.path.join(cache_dir, name))
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+    except Exception as e:
+        print(f"[Warning] Could not write cache {cache_path}: {e}")
+    return data
+
+def read_sku_excel(path):
+    """
+    Read the SKU Excel file.
+
+    :param path: Path to the SKU Excel file.
+    :return: A list of (label, address) tuples.
+    """
+    # Read the first sheet with the Rust-based calamine parser when available, else stream it with openpyxl
+    if CalamineWorkbook is not None:
+        rows = CalamineWorkbook.from_path(path).get_sheet_by_index(0).to_python()
+    else:
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = list(workbook.worksheets[0].iter_rows(values_only=True))
+        finally:
+            workbook.close()
+
+    # Keep just the Label and Address columns, skipping rows without a label
+    header = list(rows[0])
+    label_col = header.index("Label")
+    address_col = header.index("Address")
+    sku_rows = []
+    for row in rows[1:]:
+        label = row[label_col]
+        if label in (None, ""):
+            continue
+        # calamine reads a numeric label such as 12345 as 12345.0; store it as openpyxl does so both readers agree
+        if isinstance(label, float) and label.is_integer():
+            label = int(label)
+        label = str(label)
+        # Excel readers may return whole numbers as floats (3.0), so accept any value that is a whole number
+        address = row[address_col]
+        try:
+            addr = int(address)
+            if addr != float(address):
+                raise ValueError
+        except (TypeError, ValueError):
+            print(f"[Warning] SKU '{label}' has LED index {address!r}, which is not a whole number; skipping it.")
+            continue
+        sku_rows.append((label, addr))
+    return sku_rows
+
+def read_sales_orders(path):
+    """
+    Read the Sales Order CSV file.
 
-    # Once stop_event is set, ensure LEDs are turned off
-    reset_leds(address_list)
-    print(f"\nBreathing effect for color '{color_name}' on LEDs {address_list} stopped and turned off.")
+    :param path: Path to the Sales Order CSV file.
+    :return: A list of (id, sku) tuples.
+    """
+    # utf-8-sig strips the byte order mark that spreadsheet exports put before the header
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return [(row["id"], row["sku"]) for row in csv.DictReader(f)]
 
-def reset_leds(address_list):
+def build_sku_index(sku_rows):
     """
-    Turn off the specified LEDs.
+    Build a lookup table from SKU label to LED addresses.
 
-    :param address_list: A list of LED indices to turn off.
+    :param sku_rows: A list of (label, address) tuples from read_sku_excel.
+    :return: Dict mapping lowercase SKU labels to lists of in-range LED indices (empty if none are in range).
+    """
+    sku_index = {}
+    for label, addr in sku_rows:
+        # Keep the label even if its address is bad, so a scan can say why nothing lights up
+        addrs = sku_index.setdefault(label.lower(), [])
+        # Drop out-of-range addresses here, so a bad row is reported once at startup rather than on every scan
+        if not 0 <= addr < LED_COUNT:
+            print(f"[Warning] SKU '{label}' has LED index {addr}, which is out of range (0 to {LED_COUNT - 1}).")
+            continue
+        addrs.append(addr)
+    return sku_index
+
+def build_so_index(so_rows):
     """
-    with pixels_lock:
-        for addr in address_list:
-            if 0 <= addr < LED_COUNT:
-                pixels[addr] = (0, 0, 0)
-        pixels.show()
+    Build a lookup table from Sales Order ID to SKUs.
 
-def find_addresses(sku_df, so_df, user_input):
+    :param so_rows: A list of (id, sku) tuples from read_sales_orders.
+    :return: Dict mapping Sales Order IDs to lists of (sku, lowercase sku) tuples.
+    """
+    # Lowercase each SKU once here so lookups don't lowercase it again
+    so_index = {}
+    for so_id, sku in so_rows:
+        so_index.setdefault(so_id, []).append((sku, sku.lower()))
+    return so_index
+
+def find_addresses(sku_index, so_index, user_input):
     """
     Determine if the user input is a SKU or Sales Order ID and retrieve corresponding LED addresses.
 
-    :param sku_df: DataFrame containing SKU to Address mappings.
-    :param so_df: DataFrame containing Sales Order to SKU mappings.
+    :param sku_index: Dict mapping lowercase SKU labels to LED indices (see build_sku_index).
+    :param so_index: Dict mapping Sales Order IDs to SKUs (see build_so_index).
     :param user_input: The input entered by the user.
     :return: Tuple (type, addresses) where type is 'sku' or 'so' and addresses is a list of LED indices.
     """
     # Check if input is a Sales Order ID (assuming it's all digits)
     if user_input.isdigit():
         # Treat as Sales Order ID
-        # Ensure 'id' column is string for accurate comparison
-        so_df["id"] = so_df["id"].astype(str)
-        matching_rows = so_df[so_df["id"] == user_input]
+        skus = so_index.get(user_input)
 
-        if matching_rows.empty:
+        if not skus:
             print("[Info] No Sales Order match found.")
             return (None, None)
         else:
-            # Retrieve all SKUs associated with this Sales Order
-            skus = matching_rows["sku"].tolist()
+            # Retrieve all LED addresses for the SKUs in this Sales Order
             addresses = []
-            for sku in skus:
-                sku_match = sku_df[sku_df["Label"].str.lower() == sku.lower()]
-                if not sku_match.empty:
-                    addr = sku_match["Address"].tolist()
+            for sku, sku_lc in skus:
+                addr = sku_index.get(sku_lc)
+                if addr:
                     addresses.extend(addr)
-                else:
+                elif addr is None:
                     print(f"[Warning] SKU '{sku}' in Sales Order '{user_input}' not found in SKU mapping.")
+                else:
+                    print(f"[Warning] SKU '{sku}' in Sales Order '{user_input}' has no valid LED address.")
             if not addresses:
                 print(f"[Info] No valid LED addresses found for Sales Order '{user_input}'.")
                 return (None, None)
             return ('so', addresses)
     else:
         # Treat as SKU
-        sku_match = sku_df[sku_df["Label"].str.lower() == user_input.lower()]
-        if sku_match.empty:
+        addresses = sku_index.get(user_input.lower())
+        if addresses is None:
             print("[Info] No SKU match found.")
             return (None, None)
+        elif not addresses:
+            print(f"[Info] SKU '{user_input}' has no valid LED address.")
+            return (None, None)
         else:
-            addresses = sku_match["Address"].tolist()
-            return ('sku', addresses)
+            return ('sku', list(addresses))
 
 # ------------------------------
 # Main Loop
 # ------------------------------
 
-def main():
-    global sku_thread, sku_stop_event, so_thread, so_stop_event
+@dataclass
+class AppState:
+    """
+    Lookup tables and the animation command queue used by the input loop.
+    """
+    sku_index: dict
+    so_index: dict
+    # Commands for anim_loop, as (channel, color_name, address_list) tuples
+    commands: queue.Queue = field(default_factory=queue.Queue)
+
+def handle_input(state, user_input):
+    """
+    Look up a scanned SKU or Sales Order ID and start the matching breathing effect.
+
+    :param state: The AppState with the lookup tables and animation command queue.
+    :param user_input: The input entered by the user.
+    """
+    input_type, addresses = find_addresses(state.sku_index, state.so_index, user_input)
+
+    if addresses is None:
+        return  # Invalid input, prompt again
+
+    if input_type == 'sku':
+        # Handle SKU breathing effect, replacing any SKU effect already running
+        breath_color = "White"  # You can modify this or make it dynamic
+        print(f"[Info] Starting breathing effect on SKU LEDs: {addresses} with color: {breath_color}")
+        state.commands.put(('sku', breath_color, addresses))
 
-    # Load the SKU and Sales Order files into DataFrames
+    elif input_type == 'so':
+        # Handle Sales Order breathing effect, replacing any Sales Order effect already running
+        breath_color = "Blue"  # Assign a different color for Sales Orders
+        print(f"[Info] Starting breathing effect on Sales Order LEDs: {addresses} with color: {breath_color}")
+        state.commands.put(('so', breath_color, addresses))
+
+def main():
+    # Load the SKU and Sales Order files
     try:
-        sku_df = pd.read_excel(SKU_EXCEL_FILE_PATH)
+        sku_rows = load_cached(SKU_EXCEL_FILE_PATH, read_sku_excel)
     except FileNotFoundError:
         print(f"[Error] SKU Excel file not found at path: {SKU_EXCEL_FILE_PATH}")
         return
@@ -202,7 +492,7 @@ def main():
         return
 
     try:
-        so_df = pd.read_csv(SALES_ORDER_CSV_PATH)
+        so_rows = load_cached(SALES_ORDER_CSV_PATH, read_sales_orders)
     except FileNotFoundError:
         print(f"[Error] Sales Order CSV file not found at path: {SALES_ORDER_CSV_PATH}")
         return
@@ -211,12 +501,17 @@ def main():
         return
 
     # Debugging: Print the first few rows to verify data
-    print("\n--- SKU DataFrame Head ---")
-    print(sku_df.head())
-    print("\n--- Sales Order DataFrame Head ---")
-    print(so_df.head())
+    print("\n--- SKU Mapping Head ---")
+    for label, addr in sku_rows[:5]:
+        print(f"{addr:>5}  {label}")
+    print("\n--- Sales Order Head ---")
+    for so_id, sku in so_rows[:5]:
+        print(f"{so_id}  {sku}")
     print("\n------------------------------\n")
 
+    # Build the lookup tables once so each scan is a dictionary lookup
+    state = AppState(build_sku_index(sku_rows), build_so_index(so_rows))
+
     print("=== WS2812B LED Control ===")
     print("Available colors:", ", ".join(COLOR_MAP.keys()))
     print("Type 'exit' to quit the program.\n")
@@ -224,70 +519,31 @@ def main():
     print("- To scan a SKU, enter the SKU code (e.g., ED-BB-TI-16g-D3).")
     print("- To scan a Sales Order ID, enter the numeric ID (e.g., 101536679).\n")
 
-    while True:
-        user_input = input("Enter SKU or Sales Order ID (or type 'exit' to quit): ").strip()
-
-        if user_input.lower() == 'exit':
-            print("Exiting program.")
-            break
+    # Start the animation thread that drives every breathing effect
+    anim_thread = threading.Thread(target=anim_loop, args=(state.commands,), daemon=True)
+    anim_thread.start()
 
-        input_type, addresses = find_addresses(sku_df, so_df, user_input)
+    try:
+        while True:
+            user_input = input("Enter SKU or Sales Order ID (or type 'exit' to quit): ").strip()
 
-        if addresses is None:
-            continue  # Invalid input, prompt again
-
-        if input_type == 'sku':
-            # Handle SKU breathing effect
-            breath_color = "White"  # You can modify this or make it dynamic
-
-            # Stop existing SKU breathing effect if running
-            if sku_thread and sku_thread.is_alive():
-                print("[Info] Stopping the current SKU breathing effect...")
-                sku_stop_event.set()
-                sku_thread.join()
-                sku_stop_event.clear()
-
-            # Start new SKU breathing effect
-            print(f"[Info] Starting breathing effect on SKU LEDs: {addresses} with color: {breath_color}")
-            sku_thread = threading.Thread(
-                target=breathe_effect,
-                args=(breath_color, addresses, BREATH_DURATION, FPS, sku_stop_event),
-                daemon=True
-            )
-            sku_thread.start()
-
-        elif input_type == 'so':
-            # Handle Sales Order breathing effect
-            breath_color = "Blue"  # Assign a different color for Sales Orders
-
-            # Stop existing Sales Order breathing effect if running
-            if so_thread and so_thread.is_alive():
-                print("[Info] Stopping the current Sales Order breathing effect...")
-                so_stop_event.set()
-                so_thread.join()
-                so_stop_event.clear()
-
-            # Start new Sales Order breathing effect
-            print(f"[Info] Starting breathing effect on Sales Order LEDs: {addresses} with color: {breath_color}")
-            so_thread = threading.Thread(
-                target=breathe_effect,
-                args=(breath_color, addresses, BREATH_DURATION, FPS, so_stop_event),
-                daemon=True
-            )
-            so_thread.start()
-
-    # After exiting the loop, ensure all breathing threads are stopped and LEDs are turned off
-    print("[Info] Shutting down all breathing effects...")
-    if sku_thread and sku_thread.is_alive():
-        sku_stop_event.set()
-        sku_thread.join()
+            if user_input.lower() == 'exit':
+                print("Exiting program.")
+                break
 
-    if so_thread and so_thread.is_alive():
-        so_stop_event.set()
-        so_thread.join()
+            handle_input(state, user_input)
+    except (KeyboardInterrupt, EOFError):
+        # Ctrl+C or a closed input stream still goes through the shutdown below, so no LEDs stay lit
+        print("\nExiting program.")
 
-    reset_leds([])  # Turn off all LEDs
-    print("All LEDs turned off. Goodbye!")
+    # After exiting the loop, stop the animation thread, which turns all LEDs off
+    print("[Info] Shutting down all breathing effects...")
+    state.commands.put(None)
+    anim_thread.join(timeout=2.0)
+    if anim_thread.is_alive():
+        print("[Warning] Animation thread did not stop in time; LEDs may still be lit.")
+    else:
+        print("All LEDs turned off. Goodbye!")
 
 if __name__ == "__main__":
     main()